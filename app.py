@@ -1,7 +1,59 @@
-# Version 3.8.1:
-# - Added Persistent Sessions: Users remain logged in for 24 hours via cookies.
-# - Cleaned up imports and file structure.
-# - UI Overhaul: Moved Main Interface and Logs into separate tabs ("Article Writer", "Research Logs").
+# Version 3.12.13:
+# - The trend warm-up runs once per day (keyed on the Asia/Singapore date of the keyword cache sheet), not once per process.
+# Previous versions:
+# - Version 3.12.12: A streamed pack is only saved, remembered and shown for review when the stream finished with STOP.
+# - Version 3.12.11: The processing flags are cleared unconditionally in finally, and on Logout. Repeated Generate clicks are
+#   recognised against the last finished request (last_done_request) instead of the in-flight one.
+# - Version 3.12.10: Trend pre-warming runs once per process on its own single-worker executor (start_trend_prewarm)
+#   and draws nothing; get_cached_trending_keywords waits for a running warm-up instead of scanning the sheets twice.
+# - Version 3.12.9: Internal-link queries are de-duplicated by dedupe_search_queries(); the early stop on the link cap is removed,
+#   since all searches are already submitted (the query cap is what saves API calls).
+# - Version 3.12.8: The processing flags are cleared in a finally block again (also on Stop), except when a rerun interrupted the run.
+# - Version 3.12.7: "Refresh web research" uses a per-topic generation instead of clearing everyone's research cache,
+#   skips cached searches, keeps the stored research if the refresh fails, and unticks itself once the run starts.
+# - Version 3.12.6: make_topic_key keeps word order and non-ASCII letters, so different topics no longer share research.
+# - Version 3.12.5: check_password rejects empty input, and user entries with neither a password nor a password_sha256.
+# - Version 3.12.4: Trending keywords are pre-warmed on the background executor once per session after login.
+# - Version 3.12.3: Internal-link queries are de-duplicated and capped, and link collection stops at MAX_INTERNAL_LINKS.
+# - Version 3.12.2: Added a "Refresh web research" option that bypasses the research cache for the current topic.
+# - Version 3.12.1: Internal-link search queries are cached for 24 hours per topic key (get_cached_internal_queries).
+# - Version 3.12.0: Internal link searches run concurrently (run_in_script_thread) instead of one after another.
+# - Version 3.11.5: Complete web research is also persisted in the on-disk pack cache, so it survives restarts and redeploys.
+# - Version 3.11.4: Research sources and internal links each render as a single markdown list; duplicate sources are dropped.
+# - Version 3.11.3: Users can store a SHA-256 digest (password_sha256) instead of a plaintext password; see check_password.
+# - Version 3.11.2: The research cache is keyed on make_topic_key(), so reworded and reordered topics reuse the same research.
+# - Version 3.11.1: Complete web research results are cached for 24 hours per (topic, audience) (get_cached_web_research).
+# - Version 3.11.0: Trending keywords are fetched on a worker thread while web research runs (start_trending_fetch).
+# - Version 3.10.4: The WordPress title and body are extracted once per pack (get_wordpress_fields); Send is disabled when either is missing.
+# - Version 3.10.3: Session state defaults are initialized from one table with setdefault.
+# - Version 3.10.2: Login and cookie checks look users up in a cached username map (get_user_directory); passwords use hmac.compare_digest.
+# - Version 3.10.1: The WordPress Send/Cancel buttons rerun only the publishing fragment (st.rerun(scope="fragment")).
+# - Version 3.10.0: Each user's last pack is persisted in the on-disk pack cache and restored after a refresh or restart (24h).
+# - Version 3.9.19: The parsed pack is no longer kept in session state; get_parsed_package() memoizes it with st.cache_data.
+# - Version 3.9.18: The WordPress draft takes its Title and 1st Draft from extract_section() on the raw pack, not the parsed dict.
+# - Version 3.9.17: Admin WordPress controls moved into their own nested fragment (render_publishing_options).
+# - Version 3.9.16: The structure selector uses STRUCTURE_OPTIONS from gpt_helper instead of rebuilding the list on every rerun.
+# - Version 3.9.15: GENERIC_KEYWORDS is an immutable tuple; each run works on its own list copy.
+# - Version 3.9.14: SECTION_ICONS is a dict keyed on the canonical section names; each icon is a single lookup.
+# - Version 3.9.13: Repeated Generate clicks on the same inputs are ignored while that request is in flight (make_request_key).
+# - Version 3.9.12: Trending keywords are stripped, de-duplicated and capped (MAX_PROMPT_KEYWORDS) before reaching the prompt.
+# - Version 3.9.11: utils.wordpress_helper is imported lazily, when an admin confirms a WordPress draft.
+# - Version 3.9.10: The background Sheets save is submitted before the pack is parsed, so parsing overlaps the save.
+# - Version 3.9.9: The Sheets connect and the row write run together as one background task (save_pack_to_sheet).
+# - Version 3.9.8: parse_gpt_output and the section constants moved to utils/pack_parser.py.
+# - Version 3.9.7: The copy-to-clipboard button has a stable per-pack key.
+# - Version 3.9.6: parse_gpt_output returns oversized responses (> MAX_PARSE_CHARS) unparsed.
+# - Version 3.9.5: utils.trend_fetcher is imported lazily, on the first trending keyword fetch.
+# - Version 3.9.4: Section header lowercase forms and lengths are precomputed once (SECTION_MATCHERS).
+# - Version 3.9.3: Step 2 review panel moved into a fragment; internal links are searched once per pack.
+# - Version 3.9.2: Step 1 inputs live in an st.form, so typing or toggling options no longer reruns the whole script.
+# - Version 3.9.1: Section icons in the review panel come from the SECTION_ICONS table instead of an if/elif chain.
+# - Version 3.9.0: The writer's pack is streamed into the page with st.write_stream while it is generated.
+# - Version 3.8.5: The Google Sheets write now runs on a shared background thread pool; its result is shown on the next rerun.
+# - Version 3.8.4: Trending keywords are cached for 30 minutes with st.cache_data (get_cached_trending_keywords).
+# - Version 3.8.3: parse_gpt_output now returns the raw response immediately when no section header is present.
+# - Version 3.8.2: Replaced the per-line regex header matching in parse_gpt_output with plain string prefix checks.
+# - Version 3.8.1: Added Persistent Sessions (24h cookies), cleaned up imports, moved Main Interface and Logs into separate tabs.
 
 """
 Module: app.py
@@ -13,13 +65,22 @@ Purpose: The main Streamlit application file for the Shadee.Care Writer's Assist
 
 # --- Imports ---
 import streamlit as st
-import re
 import extra_streamlit_components as stx
 import datetime
+import hashlib
+import hmac
+import json
+import re
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from zoneinfo import ZoneInfo
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Core imports (always required)
-from utils.gpt_helper import generate_article_package, STRUCTURE_DETAILS
+from utils.gpt_helper import stream_article_package, STRUCTURE_OPTIONS
+from utils.pack_parser import parse_gpt_output, extract_section
+from utils.pkg_cache import make_cache_key, get_cached_pack, store_pack, discard_pack
 
 # Optional imports - gracefully handle missing dependencies
 try:
@@ -30,70 +91,242 @@ except Exception as e:
     write_to_sheet = None
 
 try:
-    from utils.trend_fetcher import get_trending_keywords
-except Exception as e:
-    print(f"Trending keywords disabled: {e}")
-    get_trending_keywords = lambda status_container=None: None
-
-# WordPress is optional - only needed for admin users
-try:
-    from utils.wordpress_helper import create_wordpress_draft
-except Exception as e:
-    print(f"WordPress integration disabled: {e}")
-    create_wordpress_draft = None
-
-try:
-    from utils.gemini_helper import perform_web_research, generate_internal_search_queries
+    from utils.gemini_helper import perform_web_research, generate_internal_search_queries, is_complete_research
 except Exception as e:
     print(f"Gemini research disabled: {e}")
-    perform_web_research = lambda topic, audience=None, status_container=None: None
+    perform_web_research = lambda topic, audience=None, status_container=None, refresh=False: None
     generate_internal_search_queries = lambda topic, status_container=None: []
+    is_complete_research = lambda research_data: False
 
 try:
     from utils.search_engine import google_search
 except Exception as e:
     print(f"Google search disabled: {e}")
-    google_search = lambda query, num_results=5, site_filter=None, ui_container=None: []
+    google_search = lambda query, num_results=5, site_filter=None, ui_container=None, use_cache=True: []
 
 from streamlit_extras.add_vertical_space import add_vertical_space
 from st_copy_to_clipboard import st_copy_to_clipboard
 
 # --- Constants ---
-GENERIC_KEYWORDS = ["therapy", "anxiety", "depression", "self-care", "wellness", "mental health"]
+GENERIC_KEYWORDS = ("therapy", "anxiety", "depression", "self-care", "wellness", "mental health")
 INTERNAL_SITE_URL = "vibe.shadee.care"
+MAX_INTERNAL_LINKS = 8  # Upper bound on suggested internal links per pack
+INTERNAL_LINKS_PER_QUERY = 2  # Results requested from each internal-link search
+MAX_PROMPT_KEYWORDS = 20  # Upper bound on keywords sent to the writer model
+LAST_PACK_TTL_SECONDS = 24 * 60 * 60  # How long a user's last pack is restored after a refresh or restart
+RESEARCH_TTL_SECONDS = 24 * 60 * 60  # How long complete web research is reused (in memory and on disk)
+TREND_CACHE_TIMEZONE = "Asia/Singapore"  # Timezone of the keyword cache sheet's dates (see utils/g_sheets.py)
+DUPLICATE_CLICK_WINDOW_SECONDS = 10  # A Generate click repeating a just-finished request within this window is ignored
+# Filler words ignored when matching reworded topics for the research cache.
+TOPIC_STOPWORDS = frozenset({"a", "an", "the", "and", "or", "of", "in", "on", "at", "with", "for", "to", "about", "how", "s"})
+# Review panel icons, keyed on the canonical section names returned by parse_gpt_output.
+SECTION_ICONS = {
+    "Title": "🏷️",
+    "Context & Research": "🔍",
+    "Important keywords": "🔑",
+    "1st Draft": "✍️",
+    "Social Media Ideas": "📱",
+    "Final Draft checklist": "✅",
+}
+DEFAULT_SECTION_ICON = "📄"
 
 # --- Cookie Manager ---
 # Note: CookieManager contains a widget, so it cannot be cached in newer Streamlit versions.
 def get_manager():
     return stx.CookieManager()
 
+# --- Background Workers ---
+@st.cache_resource
+def get_background_executor():
+    """A small thread pool shared across sessions for network writes that should not block the UI."""
+    return ThreadPoolExecutor(max_workers=2)
+
+def run_in_script_thread(func, container, *args, **kwargs):
+    """
+    Starts func(*args, **kwargs) on a worker thread attached to this script run, so network-bound
+    steps can overlap. Anything it draws goes into `container`, which the caller creates on the
+    script thread so threads never share an element cursor. Returns a Future with the result.
+    """
+    future = Future()
+
+    def run():
+        try:
+            with container:
+                future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    worker = threading.Thread(target=run, name=f"script-worker-{func.__name__}", daemon=True)
+    add_script_run_ctx(worker, get_script_run_ctx())
+    worker.start()
+    return future
+
+@st.cache_resource
+def get_prewarm_executor():
+    """A single worker for cache warm-ups, kept apart from the save pool so saves never queue behind them."""
+    return ThreadPoolExecutor(max_workers=1)
+
+def _prewarm_trending_keywords():
+    # Runs without a script context, so the fetch must not draw: quiet mode logs to the server console instead
+    try:
+        from utils.trend_fetcher import get_trending_keywords
+    except Exception as e:
+        print(f"Trending keywords disabled: {e}")
+        return None
+    return get_trending_keywords(quiet=True)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _start_trend_prewarm(day):
+    # Keyed on the date, so each new day gets its own warm-up; `day` itself is not used
+    return get_prewarm_executor().submit(_prewarm_trending_keywords)
+
+def start_trend_prewarm():
+    """
+    Starts one UI-free trend fetch per process per day (the keyword cache sheet is dated in TREND_CACHE_TIMEZONE).
+    It fills that day's cache row, so the first Generate only has to read it back. Returns today's Future.
+    """
+    today = datetime.datetime.now(ZoneInfo(TREND_CACHE_TIMEZONE)).strftime("%Y-%m-%d")
+    return _start_trend_prewarm(today)
+
+def start_trending_fetch(container):
+    """Starts the cached trend fetch in the background, so it overlaps web research. Returns a Future."""
+    return run_in_script_thread(get_cached_trending_keywords, container)
+
+def save_pack_to_sheet(topic, structure_choice, keywords, package_content, sources_list, username):
+    """Connects to the output sheet and appends the pack. Runs on the background executor."""
+    sheet = connect_to_sheet()
+    if not sheet:
+        return False
+    return write_to_sheet(sheet, topic, structure_choice, keywords, package_content, sources_list, username)
+
 # --- Helper Functions ---
-def parse_gpt_output(text):
-    """A robust line-by-line parser for the structured GPT output."""
-    if not text: return {}
-    sections = {
-        "Title": None, "Context & Research": None, "Important keywords": None,
-        "Writing Reminders": None, "1st Draft": None, "Social Media Ideas": None, "Final Draft checklist": None
-    }
-    parsed_data = {}
-    current_section_key = None
-    lines = text.split('\n')
-    for line in lines:
-        found_new_section = False
-        for section_name in sections.keys():
-            if re.match(rf"^\s*[\#\*\s]*{re.escape(section_name)}\s*:?", line, re.IGNORECASE):
-                current_section_key = section_name
-                header_pattern = re.compile(rf"^\s*[\#\*\s]*{re.escape(section_name)}\s*:?\s*", re.IGNORECASE)
-                initial_content = header_pattern.sub("", line).strip()
-                parsed_data[current_section_key] = [initial_content] if initial_content else []
-                found_new_section = True
-                break
-        if not found_new_section and current_section_key:
-            parsed_data[current_section_key].append(line)
-    for key, value_lines in parsed_data.items():
-        parsed_data[key] = "\n".join(value_lines).strip()
-    if not parsed_data: return {"Full Response": text}
-    return parsed_data
+@st.cache_data(ttl=1800, show_spinner=False)
+def get_cached_trending_keywords():
+    """
+    Trending keywords shared across sessions for 30 minutes, so repeat generations skip the
+    Sheets scan and AI extraction. Call inside the container the diagnostics should render in.
+    """
+    # Imported lazily: trend_fetcher pulls in pandas, which most reruns never need
+    try:
+        from utils.trend_fetcher import get_trending_keywords
+    except Exception as e:
+        print(f"Trending keywords disabled: {e}")
+        return None
+    # Let a running warm-up finish first, so both do not scan the sheets; its errors are not ours to report
+    wait([start_trend_prewarm()])
+    return get_trending_keywords()
+
+class _UncachedResult(Exception):
+    """Carries a fallback result out of a cached call, so st.cache_data does not store it."""
+    def __init__(self, value):
+        super().__init__("fallback result, not cached")
+        self.value = value
+
+def make_topic_key(topic):
+    """
+    Normalizes a topic to its content words in their original order, so case, punctuation and filler
+    changes such as "Zendaya's journey with anxiety" and "zendaya journey anxiety" share one research
+    cache entry, while reordered topics ("anxiety after a breakup" vs "a breakup after anxiety") do not.
+    """
+    words = [word for word in re.findall(r"\w+", topic.casefold()) if word not in TOPIC_STOPWORDS]
+    return " ".join(words) or topic.strip().casefold()
+
+def _research_disk_key(topic_key, audience):
+    # "v2": entries stored under the old sorted-word keys are not reused
+    return make_cache_key("web_research_v2", topic_key, audience)
+
+@st.cache_resource
+def _get_research_generations():
+    """Per-process refresh counter for each (topic key, audience); part of the research cache key."""
+    return {}
+
+@st.cache_data(ttl=RESEARCH_TTL_SECONDS, show_spinner=False)
+def _cached_web_research(topic_key, audience, generation, _topic, _refresh=False):
+    # Keyed on topic_key; the underscore keeps the original wording out of the cache key.
+    # The on-disk pack cache backs this in-memory layer, so research survives restarts and redeploys.
+    # A refresh skips the stored copy (and cached searches) but only replaces it with a complete result.
+    research_key = _research_disk_key(topic_key, audience)
+    if not _refresh:
+        stored = get_cached_pack(research_key, max_age=RESEARCH_TTL_SECONDS)
+        if stored:
+            try:
+                return json.loads(stored)
+            except ValueError:
+                pass
+    research_data = perform_web_research(_topic, audience=audience, refresh=_refresh)
+    if not is_complete_research(research_data):
+        raise _UncachedResult(research_data)
+    store_pack(research_key, json.dumps(research_data, ensure_ascii=False))
+    return research_data
+
+def get_cached_web_research(topic, audience, force_refresh=False):
+    """
+    Web research shared across sessions and restarts for 24 hours per (topic key, audience). Only complete results
+    are cached, so a transient search or summarization failure is retried on the next run.
+    force_refresh researches the topic again with fresh searches; a failed refresh keeps the stored research.
+    Call inside the container the research dashboard should render in.
+    """
+    topic_key = make_topic_key(topic)
+    generations = _get_research_generations()
+    if force_refresh:
+        # A new generation gives this topic a fresh in-memory entry without evicting anyone else's
+        generations[(topic_key, audience)] = generations.get((topic_key, audience), 0) + 1
+    generation = generations.get((topic_key, audience), 0)
+    try:
+        return _cached_web_research(topic_key, audience, generation, topic, _refresh=force_refresh)
+    except _UncachedResult as uncached:
+        return uncached.value
+
+@st.cache_data(ttl=RESEARCH_TTL_SECONDS, show_spinner=False)
+def _cached_internal_queries(topic_key, _topic):
+    queries = generate_internal_search_queries(_topic, status_container=st.container())
+    # On failure the helper falls back to [topic]; retry that next time instead of caching it
+    if queries == [_topic]:
+        raise _UncachedResult(queries)
+    return queries
+
+def get_cached_internal_queries(topic):
+    """
+    Internal-link search queries shared across sessions for 24 hours per topic key.
+    Call inside the container any warning should render in.
+    """
+    try:
+        return _cached_internal_queries(make_topic_key(topic), topic)
+    except _UncachedResult as uncached:
+        return uncached.value
+
+def normalize_keywords(keywords, limit=MAX_PROMPT_KEYWORDS):
+    """Strips, de-duplicates (case-insensitively, keeping the first spelling) and caps a keyword list."""
+    unique = {}
+    for keyword in keywords:
+        keyword = keyword.strip() if keyword else ""
+        if keyword:
+            unique.setdefault(keyword.lower(), keyword)
+    return list(unique.values())[:limit]
+
+def dedupe_search_queries(queries, limit):
+    """Drops blank and repeated search queries (case-insensitively, keeping the first phrasing), up to limit."""
+    unique = {}
+    for query in queries:
+        query = query.strip() if query else ""
+        if query:
+            unique.setdefault(query.casefold(), query)
+    return list(unique.values())[:limit]
+
+def clean_section_text(value):
+    """Tidies one parsed section for display: trims whitespace and stray bold markers, swaps em dashes for commas."""
+    return value.strip().strip('*').replace('—', ',').strip()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_parsed_package(package_content):
+    """Parses and tidies a pack once; the review panel re-reads it from cache instead of session state."""
+    return {header: clean_section_text(content) for header, content in parse_gpt_output(package_content).items()}
+
+def make_request_key(topic, structure_choice, audience, use_trending_keywords):
+    """A short fingerprint of the Step 1 inputs, used to recognise repeated Generate clicks."""
+    # The refresh box is left out: it unticks itself on click, so a double-click would otherwise look like a new request
+    request = f"{topic}|{structure_choice}|{audience}|{use_trending_keywords}"
+    return hashlib.blake2b(request.encode("utf-8"), digest_size=16).hexdigest()
 
 def start_processing():
     """Callback to start the generation process."""
@@ -103,10 +336,20 @@ def start_processing():
         st.toast("⚠️ Please enter an article topic first!", icon="⚠️")
         return
 
+    request_key = make_request_key(topic, st.session_state.get("structure_input"), st.session_state.get("audience_input"), st.session_state.get("trending_input"))
+    # A repeated click on the same inputs that lands just after that request finished is a no-op
+    last_done = st.session_state.get("last_done_request")
+    if last_done and last_done[0] == request_key and time.time() - last_done[1] < DUPLICATE_CLICK_WINDOW_SECONDS:
+        return
+
+    st.session_state.inflight_request = request_key
     st.session_state.processing = True
+    # The refresh applies to this run only: remember it, then untick the box so later runs use the cache again
+    st.session_state.refresh_research_pending = st.session_state.get("refresh_research_input", False)
+    st.session_state.refresh_research_input = False
     st.session_state.confirm_wordpress_send = False
     # Clear previous results
-    keys_to_clear = ['generated_package', 'parsed_package', 'research_data', 'internal_links', 'search_queries', 'keywords_used']
+    keys_to_clear = ['generated_package', 'research_data', 'internal_links', 'search_queries', 'keywords_used']
     for k in keys_to_clear:
         if k in st.session_state: del st.session_state[k]
     
@@ -116,7 +359,6 @@ def start_processing():
 def reset_app():
     """Callback to reset the app state."""
     if 'generated_package' in st.session_state: del st.session_state['generated_package']
-    if 'parsed_package' in st.session_state: del st.session_state['parsed_package']
     if 'research_data' in st.session_state: del st.session_state['research_data']
     if 'internal_links' in st.session_state: del st.session_state['internal_links']
     if 'search_queries' in st.session_state: del st.session_state['search_queries']
@@ -126,9 +368,150 @@ def reset_app():
     if 'topic_input' in st.session_state: del st.session_state['topic_input']
     if 'structure_choice' in st.session_state: del st.session_state['structure_choice']
     if 'research_logs' in st.session_state: del st.session_state['research_logs']
+    forget_last_pack(st.session_state.get("username"))
     st.session_state.processing = False
+    st.session_state.inflight_request = None
     st.toast("✅ Form cleared! Ready for next article", icon="✅")
 
+# --- Last Pack Persistence ---
+# Each user's most recent pack is kept in the on-disk pack cache, so a browser refresh
+# or server restart shows it again instead of forcing a new (paid) generation.
+def _last_pack_key(username):
+    return make_cache_key("last_pack", username)
+
+def remember_last_pack(username, topic, structure_choice, package_content, research_data):
+    """Stores the user's latest pack and its research sources on disk."""
+    if not username: return
+    research_data = research_data or {}
+    research = {"summary": research_data.get("summary", ""), "sources": research_data.get("sources", [])}
+    record = {"topic": topic, "structure_choice": structure_choice, "package": package_content, "research_data": research}
+    store_pack(_last_pack_key(username), json.dumps(record, ensure_ascii=False))
+
+def restore_last_pack(username):
+    """Reloads the user's latest pack into session state, if one was stored in the last 24 hours."""
+    if not username or 'generated_package' in st.session_state: return
+    stored = get_cached_pack(_last_pack_key(username), max_age=LAST_PACK_TTL_SECONDS)
+    if not stored: return
+    try:
+        record = json.loads(stored)
+    except ValueError:
+        return
+    st.session_state.generated_package = record["package"]
+    st.session_state.topic = record["topic"]
+    st.session_state.structure_choice = record["structure_choice"]
+    st.session_state.research_data = record.get("research_data") or {"summary": "", "sources": []}
+
+def forget_last_pack(username):
+    """Drops the user's stored pack, e.g. after they clear the form."""
+    if username:
+        discard_pack(_last_pack_key(username))
+
+# --- Review Section ---
+@st.fragment
+def render_review_section(tab_logs):
+    """
+    Renders Step 2 (the review panel) as a fragment, so interacting with its own widgets
+    reruns only this section instead of the whole app.
+    """
+    st.header("Step 2: Review Your Writer's Pack")
+    full_package = st.session_state.generated_package
+    parsed_package = get_parsed_package(full_package)
+    with st.container(border=True):
+        for header, content in parsed_package.items():
+            # SKIP Writing Reminders as per user request
+            if "Writing Reminders" in header:
+                continue
+
+            icon = SECTION_ICONS.get(header, DEFAULT_SECTION_ICON)
+            with st.expander(f"{icon} {header}", expanded=True):
+                st.markdown(content)
+
+        research_sources = st.session_state.get('research_data', {}).get('sources', [])
+        if research_sources:
+            with st.expander("📚 Research Sources", expanded=True):
+                # One markdown element for the whole list, with repeated URLs dropped
+                st.markdown("\n".join(f"- {source}" for source in dict.fromkeys(research_sources)))
+
+        with st.expander("🔗 Suggested Internal Links from Vibe.Shadee.Care"):
+            # Search once per pack; later reruns reuse the stored links instead of repeating the API calls
+            if st.session_state.get('internal_links') is None:
+                with st.spinner("Finding related articles..."):
+                    with tab_logs:
+                        smart_queries = get_cached_internal_queries(st.session_state.topic)
+                    # Run the searches side by side; each logs into its own slot in the logs tab, in query order
+                    # Drop repeated phrasings and any queries beyond what the link cap can use
+                    max_queries = -(-MAX_INTERNAL_LINKS // INTERNAL_LINKS_PER_QUERY)
+                    smart_queries = dedupe_search_queries(smart_queries, limit=max_queries)
+                    st.session_state.setdefault('search_queries', [])
+                    searches = [
+                        run_in_script_thread(google_search, tab_logs.container(), query, num_results=INTERNAL_LINKS_PER_QUERY, site_filter=INTERNAL_SITE_URL)
+                        for query in smart_queries
+                    ]
+                    internal_links = {}
+                    for search in searches:
+                        internal_links.update(dict.fromkeys(search.result()))
+                    st.session_state.internal_links = sorted(list(internal_links)[:MAX_INTERNAL_LINKS])
+
+            if st.session_state.internal_links:
+                st.markdown("\n".join(f"- {link}" for link in st.session_state.internal_links))
+            else:
+                st.write("No relevant internal articles were found for this topic.")
+
+        add_vertical_space(1)
+
+        # Simple Copy Button (No duplicate text container)
+        # A key tied to the pack keeps the same component instance across reruns
+        st_copy_to_clipboard(full_package, "📋 Copy Article to Clipboard", key=f"copy_{hash(full_package)}")
+
+        if st.session_state.get("role") == "admin":
+            render_publishing_options(full_package)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_wordpress_fields(package_content):
+    """Returns the (title, body) for a WordPress draft, pulled straight from the raw pack once per pack."""
+    return clean_section_text(extract_section(package_content, "Title")), clean_section_text(extract_section(package_content, "1st Draft"))
+
+@st.fragment
+def render_publishing_options(full_package):
+    """
+    Renders the admin WordPress controls as a nested fragment, so the confirm buttons
+    rerun only these controls instead of the pack expanders and copy button above them.
+    """
+    st.divider()
+    st.subheader("Publishing Options")
+
+    post_title, post_content = get_wordpress_fields(full_package)
+    wp_placeholder = st.empty()
+    if st.session_state.get('confirm_wordpress_send'):
+        with wp_placeholder.container():
+            st.warning("Are you sure you want to proceed?")
+            col1, col2, _ = st.columns([1, 1, 5])
+            with col1:
+                if st.button("✅ Yes, proceed"):
+                    if not post_title or not post_content:
+                        st.error("Action failed: Could not find Title or 1st Draft.")
+                    else:
+                        # WordPress is optional and admin-only, so its helper is imported on first use
+                        try:
+                            from utils.wordpress_helper import create_wordpress_draft
+                        except Exception as e:
+                            print(f"WordPress integration disabled: {e}")
+                            st.error("WordPress integration is not available.")
+                        else:
+                            with st.spinner("Sending to WordPress..."):
+                                create_wordpress_draft(post_title, post_content)
+                    st.session_state.confirm_wordpress_send = False
+            with col2:
+                if st.button("❌ No, cancel"):
+                    st.session_state.confirm_wordpress_send = False
+                    st.rerun(scope="fragment")
+    else:
+        with wp_placeholder.container():
+            # Disabled up front when the pack has nothing to send, instead of failing after confirmation
+            if st.button("🚀 Send to WordPress as Draft", disabled=not (post_title and post_content), help=None if post_title and post_content else "Could not find Title or 1st Draft."):
+                st.session_state.confirm_wordpress_send = True
+                st.rerun(scope="fragment")
+
 # --- Main Application Logic ---
 def run_main_app():
     """Renders the main writer's assistant application after successful login."""
@@ -150,6 +533,8 @@ def run_main_app():
             st.session_state.authenticated = False
             st.session_state.username = ""
             st.session_state.role = ""
+            st.session_state.processing = False
+            st.session_state.inflight_request = None
             st.rerun()
             
         st.markdown(
@@ -178,10 +563,29 @@ def run_main_app():
              st.session_state.authenticated = False
              st.session_state.username = ""
              st.session_state.role = ""
+             st.session_state.processing = False
+             st.session_state.inflight_request = None
              st.rerun()
 
     st.markdown("This tool helps you brainstorm and create draft articles for the Shadee.Care blog.")
     
+    # Bring back the user's last pack once per session (after a refresh, reconnect or restart)
+    if not st.session_state.get("last_pack_checked"):
+        st.session_state.last_pack_checked = True
+        restore_last_pack(st.session_state.username)
+
+    # Warm the daily trend cache once per process per day, so Generate usually skips the Sheets scan and AI extraction
+    start_trend_prewarm()
+
+    # --- Background save status ---
+    save_future = st.session_state.get("save_future")
+    if save_future is not None and save_future.done():
+        del st.session_state["save_future"]
+        if save_future.exception() is None and save_future.result():
+            st.toast("Pack saved successfully to Google Sheets!", icon="💾")
+        else:
+            st.warning("The pack could not be saved to Google Sheets. Please copy it manually.")
+
     # --- UI TABS ---
     tab_main, tab_logs = st.tabs(["📝 Article Writer", "⚙️ Research Logs"])
     
@@ -203,38 +607,46 @@ def run_main_app():
     # --- TAB 1: MAIN WRITER ---
     with tab_main:
         st.header("Step 1: Define Your Article")
-        topic = st.text_input(
-            "Enter the article topic:",
-            placeholder="e.g., 'Overcoming the fear of failure' or a celebrity profile like 'Zendaya's journey with anxiety'",
-            key="topic_input",
-            disabled=st.session_state.processing
-        )
-        structure_keys_list = list(STRUCTURE_DETAILS.keys())
-        structure_options = structure_keys_list + ["Let AI decide"]
-        structure_choice = st.selectbox("Choose an article structure:", options=structure_options, index=len(structure_keys_list), disabled=st.session_state.processing)
+        # Inputs are batched in a form so editing them does not rerun the script until submit
+        with st.form("define_article", clear_on_submit=False, border=False):
+            topic = st.text_input(
+                "Enter the article topic:",
+                placeholder="e.g., 'Overcoming the fear of failure' or a celebrity profile like 'Zendaya's journey with anxiety'",
+                key="topic_input",
+                disabled=st.session_state.processing
+            )
+            structure_choice = st.selectbox("Choose an article structure:", options=STRUCTURE_OPTIONS, index=len(STRUCTURE_OPTIONS) - 1, key="structure_input", disabled=st.session_state.processing)
         
-        # Audience targeting selector
-        st.markdown("**Target Audience:**")
-        audience = st.radio(
-            "Optimize content for:",
-            options=["Youth (13-18)", "Young Adults (19-30+)"],
-            index=1,  # Default to Young Adults
-            horizontal=True,
-            help="Youth: Gen-Z focused with trendy lingos | Young Adults: Professional yet fresh Millennial tone",
-            disabled=st.session_state.processing
-        )
+            # Audience targeting selector
+            st.markdown("**Target Audience:**")
+            audience = st.radio(
+                "Optimize content for:",
+                options=["Youth (13-18)", "Young Adults (19-30+)"],
+                index=1,  # Default to Young Adults
+                horizontal=True,
+                help="Youth: Gen-Z focused with trendy lingos | Young Adults: Professional yet fresh Millennial tone",
+                key="audience_input",
+                disabled=st.session_state.processing
+            )
         
-        use_trending_keywords = st.checkbox("Include trending keywords for SEO", value=True, disabled=st.session_state.processing)
+            use_trending_keywords = st.checkbox("Include trending keywords for SEO", value=True, key="trending_input", disabled=st.session_state.processing)
+            st.checkbox(
+                "Refresh web research (ignore cached results)",
+                value=False,
+                key="refresh_research_input",
+                help="Research for a topic (or a close rewording of it) is reused for 24 hours. Tick this to research it again.",
+                disabled=st.session_state.processing
+            )
         
-        add_vertical_space(2)
+            add_vertical_space(2)
 
-        # Buttons with on_click callbacks
-        col1, col2, col3 = st.columns([2, 2, 6], gap="small")
-        with col1:
-            st.button("Generate", type="primary", disabled=st.session_state.processing, use_container_width=True, on_click=start_processing)
+            # Submit buttons with on_click callbacks
+            col1, col2, col3 = st.columns([2, 2, 6], gap="small")
+            with col1:
+                st.form_submit_button("Generate", type="primary", disabled=st.session_state.processing, use_container_width=True, on_click=start_processing)
         
-        with col2:
-            st.button("↺ Reset", help="Clear form and start a new article", use_container_width=True, disabled=st.session_state.processing, on_click=reset_app)
+            with col2:
+                st.form_submit_button("↺ Reset", help="Clear form and start a new article", use_container_width=True, disabled=st.session_state.processing, on_click=reset_app)
 
         if st.session_state.processing:
             try:
@@ -242,6 +654,7 @@ def run_main_app():
                 if not topic or not topic.strip():
                     st.error("Topic is required but missing. This should not happen.")
                     st.session_state.processing = False
+                    st.session_state.inflight_request = None
                     st.rerun()
                 else:
                     research_data = None
@@ -250,9 +663,13 @@ def run_main_app():
                     # Clear logs for new run
                     st.session_state.research_logs = []
                     
+                    # Fetch trends in parallel with the research below; both are network-bound
+                    trend_future = start_trending_fetch(tab_logs.container()) if use_trending_keywords else None
+                    
                     with st.spinner("🔬 Performing live web research with AI..."):
-                        # Pass the LOGS TAB container to the researcher
-                        research_data = perform_web_research(topic, audience=audience, status_container=tab_logs)
+                        # Render inside the LOGS TAB so cached dashboards replay there too
+                        with tab_logs:
+                            research_data = get_cached_web_research(topic, audience, force_refresh=st.session_state.get("refresh_research_pending", False))
                     
                     # Persist logs
                     if research_data and 'logs' in research_data:
@@ -279,10 +696,11 @@ def run_main_app():
                         st.session_state.research_data = {"summary": research_context, "sources": []}
                         st.session_state.research_logs.append({"message": "ℹ️ **No live research found.** Using AI knowledge.", "level": "markdown"})
                     
-                    keywords_for_generation = GENERIC_KEYWORDS
+                    keywords_for_generation = list(GENERIC_KEYWORDS)
                     if use_trending_keywords:
                         with st.spinner("📈 Fetching and analyzing latest keyword trends..."):
-                            fetched_keywords = get_trending_keywords(status_container=tab_logs)
+                            fetched_keywords = trend_future.result()
+                        fetched_keywords = normalize_keywords(fetched_keywords or [])
                         
                         if fetched_keywords:
                             keywords_for_generation = fetched_keywords
@@ -303,32 +721,37 @@ def run_main_app():
                             st.write(", ".join(keywords_for_generation))
                     
                     st.info("🧠 Writer AI is thinking...")
-                    with st.spinner("✍️ Crafting your writer's pack..."):
-                        package_content = generate_article_package(
-                            topic, structure_choice, keywords=keywords_for_generation, research_context=research_context, audience=audience)
+                    # Stream the pack into the page as it is written instead of blocking on a spinner
+                    stream_outcome = {}
+                    with st.container(border=True):
+                        package_content = st.write_stream(stream_article_package(
+                            topic, structure_choice, keywords=keywords_for_generation, research_context=research_context, audience=audience,
+                            outcome=stream_outcome))
+                    # A failed or cut-short stream (error, MAX_TOKENS, safety stop) is not a pack: never save or remember it
+                    if not isinstance(package_content, str) or stream_outcome.get("finish_reason") != "STOP":
+                        package_content = None
                     
                     if package_content:
-                        parsed_package = parse_gpt_output(package_content)
-                        for key, value in parsed_package.items():
-                            parsed_package[key] = value.strip().strip('*').replace('—', ',').strip()
-                        
-                        st.session_state.generated_package = package_content
-                        st.session_state.parsed_package = parsed_package
-                        st.session_state.topic = topic
-                        st.session_state.structure_choice = structure_choice
-    
                         with st.spinner("💾 Saving..."):
                             if connect_to_sheet is None or write_to_sheet is None:
                                 st.warning("Google Sheets integration not configured. Skipping save.")
                                 st.info("Generated content is displayed below but not saved to sheets.")
                             else:
-                                sheet = connect_to_sheet()
-                                if sheet:
-                                    sources_list = st.session_state.get('research_data', {}).get('sources', [])
-                                    write_to_sheet(
-                                        sheet, topic, structure_choice, keywords_for_generation,
-                                        package_content, sources_list, st.session_state.username)
-                                    st.success("Pack saved successfully to Google Sheets!")
+                                sources_list = st.session_state.get('research_data', {}).get('sources', [])
+                                # Submitted before parsing so the save overlaps it; the result is reported on a later rerun
+                                st.session_state.save_future = get_background_executor().submit(
+                                    save_pack_to_sheet,
+                                    topic, structure_choice, keywords_for_generation,
+                                    package_content, sources_list, st.session_state.username)
+
+                        # Parse now, while the save is in flight, so the review panel's first render is a cache hit
+                        get_parsed_package(package_content)
+                        
+                        st.session_state.generated_package = package_content
+                        st.session_state.topic = topic
+                        st.session_state.structure_choice = structure_choice
+                        remember_last_pack(st.session_state.username, topic, structure_choice, package_content, st.session_state.get('research_data'))
+                        st.session_state.last_done_request = (st.session_state.inflight_request, time.time())
                     else:
                         st.error("Failed to generate content.")
             except Exception as error:
@@ -336,109 +759,65 @@ def run_main_app():
                 st.error(f"An error occurred during generation: {str(error)}")
                 st.exception(error)  # Show full traceback for debugging
             finally:
+                # Runs on every exit, including reruns and the Stop button, so the form is never left disabled
                 st.session_state.processing = False
-                st.rerun()
+                st.session_state.inflight_request = None
+            st.rerun()
     
         if 'generated_package' in st.session_state:
-            st.header("Step 2: Review Your Writer's Pack")
-            full_package = st.session_state.generated_package
-            parsed_package = st.session_state.parsed_package
-            with st.container(border=True):
-                for header, content in parsed_package.items():
-                    # SKIP Writing Reminders as per user request
-                    if "Writing Reminders" in header:
-                        continue
-                        
-                    icon = "📄"
-                    if "Title" in header: icon = "🏷️"
-                    elif "Context" in header: icon = "🔍"
-                    elif "keywords" in header: icon = "🔑"
-                    elif "1st Draft" in header: icon = "✍️"
-                    elif "Social" in header: icon = "📱"
-                    elif "checklist" in header: icon = "✅"
-                    with st.expander(f"{icon} {header}", expanded=True):
-                        st.markdown(content)
-                
-                research_sources = st.session_state.get('research_data', {}).get('sources', [])
-                if research_sources:
-                    with st.expander("📚 Research Sources", expanded=True):
-                        for source in research_sources:
-                            st.markdown(f"- {source}")
-                
-                with st.expander("🔗 Suggested Internal Links from Vibe.Shadee.Care"):
-                    with st.spinner("Finding related articles..."):
-                        smart_queries = generate_internal_search_queries(st.session_state.topic, status_container=tab_logs)
-                        internal_links = set()
-                        for query in smart_queries:
-                            results = google_search(query, num_results=2, site_filter=INTERNAL_SITE_URL, ui_container=tab_logs)
-                            for url in results:
-                                internal_links.add(url)
-                        
-                        if internal_links:
-                            for link in sorted(list(internal_links)):
-                                st.markdown(f"- {link}")
-                        else:
-                            st.write("No relevant internal articles were found for this topic.")
-    
-                add_vertical_space(1)
-                
-                # Simple Copy Button (No duplicate text container)
-                st_copy_to_clipboard(full_package, "📋 Copy Article to Clipboard")
-                
-                # Persistent Debug Information Section (Moved to Logs Tab)
-                tab_logs.divider()
-                tab_logs.subheader("🔍 Debug Information")
-                
-                # Display keywords used
-                if 'keywords_used' in st.session_state:
-                    kw_data = st.session_state.keywords_used
-                    with tab_logs.expander(f"🔑 Keywords Used ({kw_data['type']})", expanded=False):
-                        st.write(", ".join(kw_data['keywords']))
-                
-                # Display all search queries and results
-                if 'search_queries' in st.session_state and st.session_state.search_queries:
-                    for idx, search_data in enumerate(st.session_state.search_queries, 1):
-                        query = search_data['query']
-                        results = search_data['results']
-                        count = search_data['count']
-                        
-                        if count > 0:
-                            with tab_logs.expander(f"🔍 Search Query #{idx}: '{query}' - Found {count} results", expanded=False):
-                                for result_idx, url in enumerate(results, 1):
-                                    st.text(f"{result_idx}. {url}")
-                        else:
-                            tab_logs.info(f"🔍 Search Query #{idx}: '{query}' - No results found")
-                
-                if st.session_state.get("role") == "admin":
-                    st.divider()
-                    st.subheader("Publishing Options")
+            render_review_section(tab_logs)
+
+            # Persistent Debug Information Section (Moved to Logs Tab)
+            tab_logs.divider()
+            tab_logs.subheader("🔍 Debug Information")
+            
+            # Display keywords used
+            if 'keywords_used' in st.session_state:
+                kw_data = st.session_state.keywords_used
+                with tab_logs.expander(f"🔑 Keywords Used ({kw_data['type']})", expanded=False):
+                    st.write(", ".join(kw_data['keywords']))
+            
+            # Display all search queries and results
+            if 'search_queries' in st.session_state and st.session_state.search_queries:
+                for idx, search_data in enumerate(st.session_state.search_queries, 1):
+                    query = search_data['query']
+                    results = search_data['results']
+                    count = search_data['count']
                     
-                    wp_placeholder = st.empty()
-                    if st.session_state.get('confirm_wordpress_send'):
-                        with wp_placeholder.container():
-                            st.warning("Are you sure you want to proceed?")
-                            col1, col2, _ = st.columns([1, 1, 5])
-                            with col1:
-                                if st.button("✅ Yes, proceed"):
-                                    post_title = parsed_package.get("Title", "").strip()
-                                    post_content = parsed_package.get("1st Draft", "").strip()
-                                    if not post_title or not post_content:
-                                        st.error("Action failed: Could not find Title or 1st Draft.")
-                                    else:
-                                        with st.spinner("Sending to WordPress..."):
-                                            create_wordpress_draft(post_title, post_content)
-                                    st.session_state.confirm_wordpress_send = False
-                            with col2:
-                                if st.button("❌ No, cancel"):
-                                    st.session_state.confirm_wordpress_send = False
-                                    st.rerun()
+                    if count > 0:
+                        with tab_logs.expander(f"🔍 Search Query #{idx}: '{query}' - Found {count} results", expanded=False):
+                            for result_idx, url in enumerate(results, 1):
+                                st.text(f"{result_idx}. {url}")
                     else:
-                        with wp_placeholder.container():
-                            if st.button("🚀 Send to WordPress as Draft"):
-                                st.session_state.confirm_wordpress_send = True
-                                st.rerun()
+                        tab_logs.info(f"🔍 Search Query #{idx}: '{query}' - No results found")
 
 # --- Login Screen Logic ---
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_user_directory():
+    """Configured users keyed by username, so each login is one dict lookup. Re-read from secrets every 10 minutes."""
+    return {user.get("username"): dict(user) for user in st.secrets["authentication"]["users"]}
+
+def check_password(user, password_input):
+    """
+    Constant-time password check. Users may store a hex SHA-256 digest as `password_sha256`
+    instead of a plaintext `password`; the digest is preferred when both are present.
+    """
+    # An empty password never matches, whatever the user entry holds
+    if not password_input:
+        return False
+    stored_hash = user.get("password_sha256")
+    if stored_hash:
+        try:
+            expected = bytes.fromhex(str(stored_hash))
+        except ValueError:
+            return False
+        return hmac.compare_digest(hashlib.sha256(password_input.encode("utf-8")).digest(), expected)
+    stored_password = user.get("password")
+    # Entries with neither a password nor a digest configured cannot log in
+    if stored_password is None or str(stored_password) == "":
+        return False
+    return hmac.compare_digest(str(stored_password).encode("utf-8"), password_input.encode("utf-8"))
+
 def login_screen():
     """Renders the login screen and handles authentication."""
     st.title("Shadee.Care Writer's Assistant Login")
@@ -452,14 +831,13 @@ def login_screen():
         
         if auth_cookie and not st.session_state.authenticated:
             # Validate cookie against users (simple check if username exists)
-            users = st.secrets["authentication"]["users"]
-            for user in users:
-                if user.get("username") == auth_cookie:
-                    st.session_state.authenticated = True
-                    st.session_state.username = user.get("username")
-                    st.session_state.role = user.get("role", "writer")
-                    st.rerun()
-                    return
+            user = get_user_directory().get(auth_cookie)
+            if user:
+                st.session_state.authenticated = True
+                st.session_state.username = user.get("username")
+                st.session_state.role = user.get("role", "writer")
+                st.rerun()
+                return
     except Exception as e:
         print(f"Cookie check error: {e}")
 
@@ -485,13 +863,9 @@ def login_screen():
 
         if submitted:
             try:
-                users = st.secrets["authentication"]["users"]
-                user_found = None
-                for user in users:
-                    if user.get("username") == username_input:
-                        user_found = user
-                        break
-                if user_found and user_found.get("password") == password_input:
+                user_found = get_user_directory().get(username_input)
+                # Constant-time comparison, so response timing does not reveal password prefixes
+                if user_found and check_password(user_found, password_input):
                     st.session_state.authenticated = True
                     st.session_state.username = user_found.get("username")
                     st.session_state.role = user_found.get("role", "writer")
@@ -525,14 +899,19 @@ def main():
         initial_sidebar_state=st.session_state.sidebar_state
     )
 
-    if 'authenticated' not in st.session_state: st.session_state.authenticated = False
-    if 'username' not in st.session_state: st.session_state.username = ""
-    if 'role' not in st.session_state: st.session_state.role = ""
-    if 'processing' not in st.session_state: st.session_state.processing = False
-    if 'confirm_wordpress_send' not in st.session_state: st.session_state.confirm_wordpress_send = False
-    if 'research_data' not in st.session_state: st.session_state.research_data = {"summary": "", "sources": []}
-    if 'internal_links' not in st.session_state: st.session_state.internal_links = None
-    if 'research_logs' not in st.session_state: st.session_state.research_logs = []
+    # Session defaults in one place; the mutable values are built fresh here so sessions never share them
+    session_defaults = (
+        ("authenticated", False),
+        ("username", ""),
+        ("role", ""),
+        ("processing", False),
+        ("confirm_wordpress_send", False),
+        ("research_data", {"summary": "", "sources": []}),
+        ("internal_links", None),
+        ("research_logs", []),
+    )
+    for key, default in session_defaults:
+        st.session_state.setdefault(key, default)
 
     if st.session_state.authenticated:
         run_main_app()
@@ -1,8 +1,13 @@
-# Version 2.2.0:
-# - Added a 'Sources' column to the output sheet (Column F).
-# - Moved 'Username' to Column G.
-# - Updated the write_to_sheet function to handle the new structure.
+# Version 2.3.3:
+# - read_keyword_cache / write_keyword_cache take quiet=True to log to the server console instead of the page,
+#   for callers without a script context (the background trend warm-up).
 # Previous versions:
+# - Version 2.3.2: Requests on the shared gspread client are serialized with _api_lock, since saves now run on
+#   background threads alongside the trend fetch.
+# - Version 2.3.1: A save is now a single Sheets API request: the header check on 'Sheet1' runs once per process
+#   (cached worksheet) and the row goes out in one append_rows call.
+# - Version 2.3.0: Cached the authorized gspread client and output spreadsheet with st.cache_resource.
+# - Version 2.2.0: Added a 'Sources' column (Column F), moved 'Username' to Column G.
 # - Version 2.1.0: Refactored sheet creation logic to be more robust.
 
 """
@@ -14,6 +19,7 @@ Manages connections to both the output sheet and the keyword cache sheet.
 # --- Imports ---
 import streamlit as st
 import gspread
+import threading
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from google.oauth2.service_account import Credentials
@@ -25,6 +31,23 @@ CACHE_WORKSHEET_NAME = "Keyword Cache"
 # NEW: Header updated to include "Sources" and move "Username"
 OUTPUT_HEADER = ["Timestamp", "Topic", "Structure Choice", "Keywords", "Generated Output", "Sources", "Username"]
 CACHE_HEADER = ["Cache_Date", "Keywords"]
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+# The shared client's HTTP session is not thread-safe; background saves and the trend fetch take this lock.
+_api_lock = threading.Lock()
+
+# --- Cached connection resources ---
+# Shared across reruns and sessions. Exceptions are not cached, so a failed connect is retried next call.
+@st.cache_resource(show_spinner=False)
+def _get_client():
+    """Authorizes the service account once and returns the shared gspread client."""
+    creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=SCOPES)
+    return gspread.authorize(creds)
+
+@st.cache_resource(show_spinner=False)
+def _get_output_spreadsheet():
+    """Opens the output spreadsheet once and returns the shared handle."""
+    return _get_client().open(OUTPUT_SPREADSHEET_NAME)
 
 # --- Helper to create worksheet and/or header ---
 def _ensure_worksheet_and_header(spreadsheet, worksheet_name, header):
@@ -48,15 +71,17 @@ def _ensure_worksheet_and_header(spreadsheet, worksheet_name, header):
             raise e
     return worksheet
 
+@st.cache_resource(show_spinner=False)
+def _get_output_worksheet():
+    """Returns the shared output worksheet, checking its header only on first use."""
+    return _ensure_worksheet_and_header(_get_output_spreadsheet(), OUTPUT_WORKSHEET_NAME, OUTPUT_HEADER)
+
 # --- Public Functions for Output Sheet ---
 def connect_to_sheet():
     """Connects to the main output worksheet ('Sheet1')."""
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open(OUTPUT_SPREADSHEET_NAME)
-        return _ensure_worksheet_and_header(spreadsheet, OUTPUT_WORKSHEET_NAME, OUTPUT_HEADER)
+        with _api_lock:
+            return _get_output_worksheet()
     except Exception as e:
         st.error(f"Error connecting to output sheet: {e}")
         return None
@@ -76,24 +101,23 @@ def write_to_sheet(sheet, topic, structure, keywords_used, full_content, sources
         # NEW: Updated row structure to match the new 7-column header
         row_to_insert = [timestamp, topic, structure, keywords_string, full_content, sources_string, username]
         
-        sheet.append_row(row_to_insert)
+        # One request per save; RAW keeps generated text from being parsed as formulas
+        with _api_lock:
+            sheet.append_rows([row_to_insert], value_input_option="RAW")
         return True
     except Exception as e:
         st.error(f"Error writing to Google Sheets: {e}")
         return False
 
 # --- Public Functions for Keyword Cache Sheet ---
-def read_keyword_cache():
-    """Reads the keyword cache for today's date."""
+def read_keyword_cache(quiet=False):
+    """Reads the keyword cache for today's date. With quiet=True, messages go to the server log only."""
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open(OUTPUT_SPREADSHEET_NAME)
-        worksheet = _ensure_worksheet_and_header(spreadsheet, CACHE_WORKSHEET_NAME, CACHE_HEADER)
-        
         today_date_str = datetime.now(ZoneInfo("Asia/Singapore")).strftime("%Y-%m-%d")
-        records = worksheet.get_all_records()
+        with _api_lock:
+            spreadsheet = _get_output_spreadsheet()
+            worksheet = _ensure_worksheet_and_header(spreadsheet, CACHE_WORKSHEET_NAME, CACHE_HEADER)
+            records = worksheet.get_all_records()
         if not records:
             return None
             
@@ -101,30 +125,34 @@ def read_keyword_cache():
             if str(row.get("Cache_Date")) == today_date_str:
                 cached_keywords = row.get("Keywords")
                 if cached_keywords:
-                    st.success("Found a valid keyword cache from earlier today!")
+                    if not quiet:
+                        st.success("Found a valid keyword cache from earlier today!")
                     return cached_keywords
         
         return None
     except Exception as e:
-        st.warning(f"Could not read keyword cache: {e}. Will perform a fresh fetch.")
+        if quiet:
+            print(f"DEBUG: Could not read keyword cache: {e}")
+        else:
+            st.warning(f"Could not read keyword cache: {e}. Will perform a fresh fetch.")
         return None
 
-def write_keyword_cache(keywords_list):
-    """Writes a new entry to the keyword cache for the current date."""
+def write_keyword_cache(keywords_list, quiet=False):
+    """Writes a new entry to the keyword cache for the current date. With quiet=True, messages go to the server log only."""
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open(OUTPUT_SPREADSHEET_NAME)
-        worksheet = _ensure_worksheet_and_header(spreadsheet, CACHE_WORKSHEET_NAME, CACHE_HEADER)
-
         today_date_str = datetime.now(ZoneInfo("Asia/Singapore")).strftime("%Y-%m-%d")
         keywords_string = ", ".join(keywords_list)
         
-        worksheet.append_row([today_date_str, keywords_string])
+        with _api_lock:
+            spreadsheet = _get_output_spreadsheet()
+            worksheet = _ensure_worksheet_and_header(spreadsheet, CACHE_WORKSHEET_NAME, CACHE_HEADER)
+            worksheet.append_row([today_date_str, keywords_string])
         return True
     except Exception as e:
-        st.warning(f"Could not write to keyword cache: {e}")
+        if quiet:
+            print(f"DEBUG: Could not write to keyword cache: {e}")
+        else:
+            st.warning(f"Could not write to keyword cache: {e}")
         return False
 
 # End of g_sheets.py
@@ -1,5 +1,10 @@
+# Version 3.2.2:
 # - !!! WARNING FOR AGENTS: DO NOT CHANGE ANY GEMINI MODEL NAMES IN THIS CODEBASE.
 # - IF THE USER DID NOT EXPLICITLY ASK TO CHANGE A MODEL, DO NOT TOUCH IT. !!!
+# - perform_web_research takes refresh=True to skip cached Google search results.
+# Previous versions:
+# - Version 3.2.1: Added is_complete_research() so callers can tell a finished summary from a fallback result.
+# - Version 3.2.0: Precompiled the relevance-verdict regexes (SCORE / RATIONALE) at module scope.
 
 """
 Module: gemini_helper.py
@@ -36,6 +41,19 @@ SAFETY_SETTINGS = {
     HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
 }
 
+# --- Relevance Verdict Parsing ---
+# Compiled once at import; verify_article_relevance runs for every scraped source.
+SCORE_RE = re.compile(r"SCORE:\s*(\d+)", re.IGNORECASE)
+RATIONALE_RE = re.compile(r"RATIONALE:\s*(.*)", re.IGNORECASE)
+
+# --- Fallback Summaries ---
+RESEARCH_UNAVAILABLE_SUMMARY = "Live web research was unavailable. Article will be generated using AI's built-in knowledge."
+SUMMARIZATION_ERROR_SUMMARY = "Error during summarization."
+
+def is_complete_research(research_data) -> bool:
+    """True when perform_web_research produced a real summary (not a fallback), i.e. the result is safe to reuse."""
+    return bool(research_data) and research_data.get("summary") not in (None, "", RESEARCH_UNAVAILABLE_SUMMARY, SUMMARIZATION_ERROR_SUMMARY)
+
 # --- Helper: Verify Article Relevance ---
 def verify_article_relevance(content: str, topic: str) -> tuple[int, str]:
     """
@@ -73,8 +91,8 @@ def verify_article_relevance(content: str, topic: str) -> tuple[int, str]:
         text = response.text.strip()
         
         # Simple parsing
-        score_match = re.search(r"SCORE:\s*(\d+)", text, re.IGNORECASE)
-        rationale_match = re.search(r"RATIONALE:\s*(.*)", text, re.IGNORECASE)
+        score_match = SCORE_RE.search(text)
+        rationale_match = RATIONALE_RE.search(text)
         
         score = int(score_match.group(1)) if score_match else 0
         rationale = rationale_match.group(1).strip() if rationale_match else "No rationale provided."
@@ -140,11 +158,12 @@ def generate_internal_search_queries(topic: str, status_container=None) -> list[
         return [topic]
 
 # --- Refactored Smart Research Function ---
-def perform_web_research(topic: str, audience: str = "Young Adults (19-30+)", status_container=None) -> dict | None:
+def perform_web_research(topic: str, audience: str = "Young Adults (19-30+)", status_container=None, refresh: bool = False) -> dict | None:
     """
     Perform a multi-pass research loop until 7 high-quality sources are found.
     Args:
         status_container: Optional Streamlit container to render logs into.
+        refresh: If True, searches go to the API instead of reusing cached results.
     """
     print("--- Starting Smart Research Pipeline ---")
     
@@ -209,7 +228,7 @@ def perform_web_research(topic: str, audience: str = "Young Adults (19-30+)", st
         log_message(f"🚀 Attempt {attempts}/{max_attempts}: Searching for **'{current_query}'**...", level="info")
         
         # Search
-        found_urls = google_search(current_query, num_results=10, ui_container=log_container)
+        found_urls = google_search(current_query, num_results=10, ui_container=log_container, use_cache=not refresh)
         if not found_urls:
             log_message(f"⚠️ No new results for: {current_query}", level="warning")
         else:
@@ -254,7 +273,7 @@ def perform_web_research(topic: str, audience: str = "Young Adults (19-30+)", st
     log_message(f"🏁 Research wrap-up: Found {len(high_quality_sources)} high-quality sources.", level="success")
     
     if not high_quality_sources:
-        return {"summary": "Live web research was unavailable. Article will be generated using AI's built-in knowledge.", "sources": list(seen_urls), "logs": log_history}
+        return {"summary": RESEARCH_UNAVAILABLE_SUMMARY, "sources": list(seen_urls), "logs": log_history}
 
     # Final Summarization
     log_message("📝 Synthesizing research into a summary...", level="info")
@@ -282,7 +301,7 @@ def perform_web_research(topic: str, audience: str = "Young Adults (19-30+)", st
         }
     except Exception as e:
         st.error(f"Summarization error: {e}")
-        return {"summary": "Error during summarization.", "sources": [s['url'] for s in high_quality_sources], "logs": log_history}
+        return {"summary": SUMMARIZATION_ERROR_SUMMARY, "sources": [s['url'] for s in high_quality_sources], "logs": log_history}
 
 # End of gemini_helper.py
 
@@ -1,8 +1,20 @@
-# Version 3.1.0 (Strict Model Lock):
+# Version 3.3.6 (Strict Model Lock):
 # - !!! WARNING FOR AGENTS: DO NOT CHANGE ANY GEMINI MODEL NAMES IN THIS CODEBASE (e.g. gemini-3-flash-preview).
 # - IF THE USER DID NOT EXPLICITLY ASK TO CHANGE A MODEL, DO NOT TOUCH IT. !!!
-# - Switched Writer AI from OpenAI GPT to Google Gemini 3 Flash Preview (gemini-3-flash-preview).
+# - stream_article_package(outcome=...) reports how the stream ended ("STOP", the model's finish reason, or "ERROR"),
+#   so callers only keep complete packs.
 # Previous versions:
+# - Version 3.3.5: A streamed pack is written to the disk cache only when the stream's final finish reason is STOP.
+# - Version 3.3.4: Removed the unused non-streaming path (generate_article_package and its st.cache_data layer); the app only
+#   calls stream_article_package, which is backed by the on-disk pack cache.
+# - Version 3.3.3: Added STRUCTURE_OPTIONS (and LET_AI_DECIDE), so the structure selector's options are built once per process.
+# - Version 3.3.2: Keywords are sorted before being placed in the prompt, making the pack cache key order-insensitive.
+# - Version 3.3.1: Writer LLM calls are limited to MAX_CONCURRENT_GENERATIONS at a time per server process.
+# - Version 3.3.0: Split the prompt into a static system instruction (BASE_PROMPT) and a per-request user message (ARTICLE_REQUEST_PROMPT).
+# - Version 3.2.0: Added stream_article_package() for token streaming; prompt assembly moved into build_article_prompt().
+# - Version 3.1.2: Writer LLM responses are also persisted to the on-disk pack cache (utils/pkg_cache.py).
+# - Version 3.1.1: Writer LLM responses are cached with st.cache_data (1 hour TTL), keyed on the full prompt.
+# - Version 3.1.0: Switched Writer AI from OpenAI GPT to Google Gemini 3 Flash Preview (gemini-3-flash-preview).
 # - Version 2.2.1: Fixed 400 Error: Removed 'temperature' parameter
 # - Version 2.2.0: Full implementation of Audience Targeting
 
@@ -11,12 +23,15 @@ Module: gpt_helper.py
 Purpose: Contains all logic for interacting with the Writer LLM (Gemini 3 Flash Preview).
 - Defines article structures and prompt templates.
 - Constructs the final prompt based on user input (topic, style, audience).
-- Calls the Gemini API and returns the generated content package.
+- Calls the Gemini API and streams the generated content package.
 """
 
 # --- Imports ---
+import threading
+from contextlib import contextmanager
 import streamlit as st
 import google.generativeai as genai
+from .pkg_cache import make_cache_key, get_cached_pack, store_pack
 
 # --- Constants ---
 STRUCTURE_DETAILS = {
@@ -58,6 +73,10 @@ STRUCTURE_DETAILS = {
 """
 }
 
+# Choice that lets the writer pick a structure itself, and the full option list for the UI (built once per process)
+LET_AI_DECIDE = "Let AI decide"
+STRUCTURE_OPTIONS = tuple(STRUCTURE_DETAILS) + (LET_AI_DECIDE,)
+
 HIDDEN_STRUCTURE = """
 4. The Laureate's Canvas (Hidden Creative Mode)
 - Tone: Exceptional, Award-winning, Compelling, Genre-defying.
@@ -66,22 +85,15 @@ HIDDEN_STRUCTURE = """
 - Requirement: Must still include the Shadee.Care Weave-In and a Call to Action, but woven in masterfully.
 """
 
+# Static instructions sent as the system instruction. Only the audience and structure vary, so the
+# prompt prefix stays identical across requests and can be reused by the provider's prompt caching.
+# Per-request values (topic, keywords, research) belong in ARTICLE_REQUEST_PROMPT below.
 BASE_PROMPT = """
 🎯 Purpose:
-Your role is to help Shadee.Care writers create emotionally resonant, culturally relevant articles for youth (13-30 years old). The user has provided you with the topic to focus on. You will then provide topic ideas, fun facts, research points, tone reminders, and a first draft to help writers finalize their articles.
-
-🗣️ Topic: {topic}
-
-{keyword_section}
-
-📚 Live Web Research Summary:
-Based on a live web search, here is the most current information on the topic. Use this as your primary source of truth to ensure the article is accurate, fact-based, and up-to-date.
----
-{research_context}
----
+Your role is to help Shadee.Care writers create emotionally resonant, culturally relevant articles for youth (13-30 years old). The user will provide you with the topic to focus on. You will then provide topic ideas, fun facts, research points, tone reminders, and a first draft to help writers finalize their articles.
 
 🔍 Context and Research:
-Your task is to rewrite the 'Live Web Research Summary' above into the 'Context & Research' section of the writer's pack. Synthesize it, improve the flow, and ensure it fits the brand's tone. Do not simply copy it. If the research summary is empty or irrelevant, generate this section based on your own knowledge of the topic.
+Your task is to rewrite the 'Live Web Research Summary' provided with the topic into the 'Context & Research' section of the writer's pack. Synthesize it, improve the flow, and ensure it fits the brand's tone. Do not simply copy it. If the research summary is empty or irrelevant, generate this section based on your own knowledge of the topic.
 
 🔑 Keyword Strategy:
 - Always-On Keywords: Include high-interest, low-volatility keywords like therapy, anxiety, depression, self-care where relevant.
@@ -143,18 +155,56 @@ IMPORTANT: Output these as an empty checklist for the human writer. DO NOT answe
 - Final Draft checklist: [...]
 """
 
-def generate_article_package(topic, structure_choice, keywords=None, research_context="No live web research was provided.", audience="Young Adults (19-30+)"):
-    """
-    Builds the complete prompt and calls the Writer LLM (Gemini 3 Flash Preview).
-    """
-    # Configure Gemini
+# Dynamic part of the prompt, sent as the user message after the static system instruction.
+ARTICLE_REQUEST_PROMPT = """
+🗣️ Topic: {topic}
+
+{keyword_section}
+
+📚 Live Web Research Summary:
+Based on a live web search, here is the most current information on the topic. Use this as your primary source of truth to ensure the article is accurate, fact-based, and up-to-date.
+---
+{research_context}
+---
+"""
+
+# --- Concurrency Limit ---
+# At most this many Writer LLM requests run at once in this server process; further requests wait
+# for a free slot instead of piling up against the API rate limit.
+MAX_CONCURRENT_GENERATIONS = 2
+_writer_slots = threading.BoundedSemaphore(MAX_CONCURRENT_GENERATIONS)
+
+@contextmanager
+def _writer_slot(notify_user=True):
+    """Holds one Writer LLM slot for the duration of the block, optionally telling the user if they must wait."""
+    if not _writer_slots.acquire(blocking=False):
+        if notify_user:
+            st.toast("Another article is being written right now. Yours will start in a moment...", icon="⏳")
+        _writer_slots.acquire()
+    try:
+        yield
+    finally:
+        _writer_slots.release()
+
+def _get_writer_model(system_prompt):
+    """Returns the Writer LLM with the static instructions attached as its system instruction."""
+    return genai.GenerativeModel(model_name='gemini-3-flash-preview', system_instruction=system_prompt)
+
+def _configure_gemini():
+    """Configures the Gemini client from secrets. Returns False (after showing an error) if the key is missing."""
     try:
         gemini_api_key = st.secrets["google_gemini"]["API_KEY"]
         genai.configure(api_key=gemini_api_key)
+        return True
     except KeyError:
         st.error("Gemini API key not found in secrets.")
-        return None
-    
+        return False
+
+def build_article_prompts(topic, structure_choice, keywords=None, research_context="No live web research was provided.", audience="Young Adults (19-30+)"):
+    """
+    Builds the Writer LLM prompts and returns them as (system_prompt, user_prompt).
+    The system prompt depends only on audience and structure; everything per-request goes in the user prompt.
+    """
     # Define audience-specific tone instructions
     tone_instructions = ""
     system_role_content = ""
@@ -176,14 +226,15 @@ def generate_article_package(topic, structure_choice, keywords=None, research_co
 
     keyword_section = ""
     if keywords:
-        keyword_list = ", ".join(keywords)
+        # Sorted so the same keyword set always produces the same prompt (and pack cache key)
+        keyword_list = ", ".join(sorted(keywords))
         keyword_section = f"""
 🔑 SEO Keywords:
 Crucially, you are an expert SEO writer. Your main goal is to naturally weave the following keywords into the article. Do not list them out; integrate them organically into the subheadings and paragraphs:
 **{keyword_list}**
 """
 
-    if structure_choice == "Let AI decide":
+    if structure_choice == LET_AI_DECIDE:
         all_structures = "\n\n".join(STRUCTURE_DETAILS.values()) + "\n\n" + HIDDEN_STRUCTURE
         structure_instructions = f"""
 📂 Select One Structure for the Draft:
@@ -198,23 +249,63 @@ You must use the following structure for the first draft.
 {selected_structure_detail}
 """
 
-    final_prompt = f"{system_role_content}\n\n{BASE_PROMPT.format(
-        topic=topic,
-        keyword_section=keyword_section,
+    base_prompt = BASE_PROMPT.format(
         structure_instructions=structure_instructions,
-        research_context=research_context,
         tone_instructions=tone_instructions,
         audience_label=audience_label
-    )}"
-    
-    # Call Gemini model
-    print(f"DEBUG: Content generation starting for topic: '{topic}' using Writer LLM")
+    )
+    system_prompt = f"{system_role_content}\n\n{base_prompt}"
+    user_prompt = ARTICLE_REQUEST_PROMPT.format(
+        topic=topic,
+        keyword_section=keyword_section,
+        research_context=research_context
+    )
+    return system_prompt, user_prompt
+
+def stream_article_package(topic, structure_choice, keywords=None, research_context="No live web research was provided.", audience="Young Adults (19-30+)", outcome=None):
+    """
+    Builds the prompts and yields text chunks as the Writer LLM (Gemini 3 Flash Preview) produces them,
+    so the UI can show the pack while it is being written (e.g. via st.write_stream).
+    A pack found in the on-disk cache is yielded in one piece; a stream that ends with finish reason STOP is stored there.
+    If `outcome` (a dict) is given, outcome["finish_reason"] is set to how the stream ended: "STOP" for a complete
+    pack (or a cache hit), the model's finish reason name (e.g. "MAX_TOKENS", "SAFETY"), or "ERROR".
+    """
+    if outcome is None:
+        outcome = {}
+    outcome["finish_reason"] = "ERROR"
+    if not _configure_gemini():
+        return
+    system_prompt, user_prompt = build_article_prompts(topic, structure_choice, keywords, research_context, audience)
+
+    cache_key = make_cache_key("writer_pack", system_prompt, user_prompt)
+    cached_text = get_cached_pack(cache_key)
+    if cached_text:
+        outcome["finish_reason"] = "STOP"
+        yield cached_text
+        return
+
+    streamed_parts = []
+    finish_reason = None
     try:
-        model = genai.GenerativeModel(model_name='gemini-3-flash-preview')
-        response = model.generate_content(final_prompt)
-        return response.text
+        model = _get_writer_model(system_prompt)
+        with _writer_slot():
+            for chunk in model.generate_content(user_prompt, stream=True):
+                if chunk.candidates:
+                    finish_reason = chunk.candidates[0].finish_reason
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. a bare finish reason) are skipped
+                    continue
+                if chunk_text:
+                    streamed_parts.append(chunk_text)
+                    yield chunk_text
     except Exception as e:
         st.error(f"An error occurred during article generation: {e}")
-        return None
+        return
+    outcome["finish_reason"] = getattr(finish_reason, "name", None) or "ERROR"
+    # Only a pack that finished normally is cached; MAX_TOKENS or safety stops leave it truncated
+    if streamed_parts and outcome["finish_reason"] == "STOP":
+        store_pack(cache_key, "".join(streamed_parts))
 
 # End of gpt_helper.py
@@ -0,0 +1,106 @@
+# Version 1.2.2:
+# - extract_section returns the last occurrence of a repeated section, matching parse_gpt_output.
+# Previous versions:
+# - Version 1.2.1: _match_section_header rejects a line on its first character before trying any section name.
+# - Version 1.2.0: Added extract_section() to pull a single section (e.g. Title, 1st Draft) without a full parse.
+# - Version 1.1.0: parse_gpt_output walks line offsets with str.find and slices each section body out of the
+#   original text, instead of building and joining a list of lines per section.
+# - Version 1.0.0: Moved parse_gpt_output and its section constants out of app.py into a shared utils module.
+
+"""
+Module: pack_parser.py
+Purpose: Splits the Writer AI's raw output into the named sections of a writer's pack.
+- Regex-free: headers are detected with plain string prefix checks on each line.
+- Falls back to {"Full Response": text} when the output has no recognizable sections.
+"""
+
+# --- Constants ---
+# Section headers expected in the Writer AI output, in the order they are matched.
+SECTION_NAMES = ("Title", "Context & Research", "Important keywords", "Writing Reminders", "1st Draft", "Social Media Ideas", "Final Draft checklist")
+# Upper bound on the text parse_gpt_output will split into sections.
+MAX_PARSE_CHARS = 200_000
+# Precomputed (name, lowercase name, length) per header so parsing does no per-call string setup.
+SECTION_MATCHERS = tuple((name, name.lower(), len(name)) for name in SECTION_NAMES)
+# Markdown decoration the Writer AI may put in front of a header (e.g. "## " or "**").
+HEADER_LEAD_CHARS = "#* \t\r\f\v\u00a0"
+# First character of every header, lowercased; most body lines fail this check and skip the per-section compares.
+HEADER_FIRST_CHARS = frozenset(lowered_name[0] for _, lowered_name, _ in SECTION_MATCHERS)
+
+# --- Parsing ---
+def _match_section_header(line):
+    """
+    Checks whether a line opens one of the known sections.
+    Returns (section_name, inline_content) on a match, or (None, None) otherwise.
+    """
+    stripped = line.lstrip(HEADER_LEAD_CHARS)
+    if stripped[:1].lower() not in HEADER_FIRST_CHARS:
+        return None, None
+    for section_name, lowered_name, name_length in SECTION_MATCHERS:
+        if stripped[:name_length].lower() == lowered_name:
+            remainder = stripped[name_length:].lstrip()
+            if remainder.startswith(":"):
+                remainder = remainder[1:]
+            return section_name, remainder.strip()
+    return None, None
+
+def _section_text(inline_content, body):
+    """Joins a header's inline content with the lines below it, as the section's final text."""
+    if inline_content:
+        return f"{inline_content}\n{body}".strip()
+    return body.strip()
+
+def _iter_sections(text):
+    """
+    Yields (section_name, content) for each section header in the text, in order.
+    Single pass over line offsets: each section body is one slice of the original text,
+    taken between the end of its header line and the start of the next header line.
+    """
+    current_section_key = None
+    inline_content = ""
+    body_start = 0
+    position = 0
+    text_length = len(text)
+    while True:
+        newline_index = text.find('\n', position)
+        line_end = text_length if newline_index == -1 else newline_index
+        section_name, initial_content = _match_section_header(text[position:line_end])
+        if section_name:
+            if current_section_key:
+                yield current_section_key, _section_text(inline_content, text[body_start:position - 1])
+            current_section_key = section_name
+            inline_content = initial_content
+            body_start = line_end + 1
+        if newline_index == -1:
+            break
+        position = newline_index + 1
+    if current_section_key:
+        yield current_section_key, _section_text(inline_content, text[body_start:])
+
+def parse_gpt_output(text):
+    """A robust single-pass parser for the structured GPT output."""
+    if not text: return {}
+    # Guard against runaway output: a pack is a few KB, so anything this large is shown unparsed.
+    if len(text) > MAX_PARSE_CHARS:
+        return {"Full Response": text}
+    # Cheap prefilter: skip the line walk entirely when no known header appears anywhere.
+    lowered_text = text.lower()
+    if not any(lowered_name in lowered_text for _, lowered_name, _ in SECTION_MATCHERS):
+        return {"Full Response": text}
+    parsed_data = dict(_iter_sections(text))
+    if not parsed_data: return {"Full Response": text}
+    return parsed_data
+
+def extract_section(text, section_name):
+    """
+    Returns the content of the `section_name` section, or "" if there is none, without building the full section dict.
+    A repeated section resolves to its last occurrence, the same one parse_gpt_output keeps.
+    """
+    if not text or len(text) > MAX_PARSE_CHARS:
+        return ""
+    section_content = ""
+    for name, content in _iter_sections(text):
+        if name == section_name:
+            section_content = content
+    return section_content
+
+# End of pack_parser.py
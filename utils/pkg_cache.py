@@ -0,0 +1,83 @@
+# Version 1.1.1:
+# - store_pack() deletes entries older than CACHE_TTL_SECONDS, so expired rows no longer accumulate.
+# Previous versions:
+# - Version 1.1.0: get_cached_pack() takes an optional max_age; added discard_pack() to drop a single entry.
+# - Version 1.0.0: Initial implementation of a disk-backed cache for generated writer's packs.
+
+"""
+Module: pkg_cache.py
+Purpose: A small persistent key/value store (SQLite, standard library only) for generated writer's packs.
+- Survives app restarts and redeploys on the same disk, unlike st.cache_data which lives in process memory.
+- Keys are SHA-256 hashes of everything that determines the generated output.
+- Cache failures are logged and ignored; they must never block article generation.
+"""
+
+# --- Imports ---
+import hashlib
+import json
+import sqlite3
+import time
+
+# --- Constants ---
+CACHE_DB_PATH = ".genpack_cache.sqlite3"
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # One week; also the longest max_age a reader can use, as older rows are pruned
+
+def _connect():
+    """Opens a short-lived connection; one per call keeps this safe across Streamlit session threads."""
+    conn = sqlite3.connect(CACHE_DB_PATH, timeout=10)
+    conn.execute("CREATE TABLE IF NOT EXISTS packs (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS packs_created_at ON packs (created_at)")
+    return conn
+
+def make_cache_key(*parts):
+    """Builds a stable SHA-256 key from JSON-serializable parts."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cached_pack(key, max_age=CACHE_TTL_SECONDS):
+    """Returns the cached value for a key, or None if missing, older than max_age seconds or unreadable."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT value, created_at FROM packs WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row and time.time() - row[1] < max_age:
+            return row[0]
+        return None
+    except Exception as e:
+        print(f"DEBUG: Pack cache read failed: {e}")
+        return None
+
+def store_pack(key, value):
+    """Stores a value under a key, replacing any previous entry, and prunes entries past CACHE_TTL_SECONDS."""
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            with conn:
+                # Expired rows are only filtered on read, so clear them here; the created_at index keeps this cheap
+                conn.execute("DELETE FROM packs WHERE created_at < ?", (now - CACHE_TTL_SECONDS,))
+                conn.execute("INSERT OR REPLACE INTO packs (key, value, created_at) VALUES (?, ?, ?)", (key, value, now))
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"DEBUG: Pack cache write failed: {e}")
+        return False
+
+def discard_pack(key):
+    """Removes the entry for a key, if any."""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM packs WHERE key = ?", (key,))
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"DEBUG: Pack cache delete failed: {e}")
+        return False
+
+# End of pkg_cache.py
@@ -1,18 +1,32 @@
-# Version 1.3.0:
-# - Added detailed logging for search queries and results to help with debugging and monitoring.
+# Version 1.4.2:
+# - Removed the unused invalidate_search_cache(); a refresh goes through google_search(use_cache=False) instead.
 # Previous versions:
+# - Version 1.4.1: google_search(use_cache=False) skips the cached results and stores the fresh answer in their place.
+# - Version 1.4.0: Search results are cached on disk for 24 hours per (query, num_results), shared across sessions
+#   and restarts.
+# - Version 1.3.0: Added detailed logging for search queries and results to help with debugging and monitoring.
 # - Version 1.2.0: Improved error handling for quota exceeded errors with user-friendly messages and solutions.
 # - Version 1.1.0: Added an optional 'site_filter' parameter to allow for site-specific searches.
 
 """
 Module: search_engine.py
 Purpose: Handles interactions with the Google Custom Search API to fetch search results.
+Results are kept in the on-disk pack cache, so repeated queries across reruns and users skip the API.
 """
+import json
 import streamlit as st
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from .pkg_cache import make_cache_key, get_cached_pack, store_pack
 
-def google_search(query: str, num_results: int = 5, site_filter: str = None, ui_container=None) -> list[str]:
+# --- Constants ---
+SEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60  # How long a query's result URLs are reused
+
+def _search_cache_key(query, num_results):
+    """Disk cache key for a search; `query` already includes any site: filter."""
+    return make_cache_key("google_search", query, num_results)
+
+def google_search(query: str, num_results: int = 5, site_filter: str = None, ui_container=None, use_cache: bool = True) -> list[str]:
     """
     Performs a Google search and returns a list of real URLs.
 
@@ -21,29 +35,38 @@ def google_search(query: str, num_results: int = 5, site_filter: str = None, ui_
         num_results (int): The number of results to return. Max 10.
         site_filter (str, optional): A specific domain to restrict the search to.
         ui_container (streamlit.container, optional): Container to render UI elements into.
+        use_cache (bool): If False, always calls the API; the fresh results still replace the cached ones.
 
     Returns:
         list[str]: A list of result URLs, or an empty list on failure.
     """
     try:
-        api_key = st.secrets["google_search"]["API_KEY"]
-        cse_id = st.secrets["google_search"]["CSE_ID"]
-        
         # --- NEW: Add the site filter to the query if it exists ---
         if site_filter:
             query = f"{query} site:{site_filter}"
-        
-        print(f"DEBUG: Performing Google Search with query: '{query}'")
 
-        service = build("customsearch", "v1", developerKey=api_key)
-        
-        res = service.cse().list(q=query, cx=cse_id, num=num_results).execute()
+        cache_key = _search_cache_key(query, num_results)
+        cached_results = get_cached_pack(cache_key, max_age=SEARCH_CACHE_TTL_SECONDS) if use_cache else None
+        if cached_results is not None:
+            print(f"DEBUG: Google Search cache hit for query: '{query}'")
+            results = json.loads(cached_results)
+        else:
+            api_key = st.secrets["google_search"]["API_KEY"]
+            cse_id = st.secrets["google_search"]["CSE_ID"]
+
+            print(f"DEBUG: Performing Google Search with query: '{query}'")
+
+            service = build("customsearch", "v1", developerKey=api_key)
+
+            res = service.cse().list(q=query, cx=cse_id, num=num_results).execute()
+            results = [item['link'] for item in res.get('items', [])]
+            # Only answers from the API are stored; errors below return before this point
+            store_pack(cache_key, json.dumps(results))
 
         # Determine rendering context
         target_ui = ui_container if ui_container else st
 
-        if 'items' in res:
-            results = [item['link'] for item in res['items']]
+        if results:
             # Console logging (for server logs)
             print(f"✅ Google Search SUCCESS: Found {len(results)} results for query: '{query}'")
             print(f"📋 Results: {results}")
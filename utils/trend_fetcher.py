@@ -1,7 +1,12 @@
-# Version 3.1.1:
-# - Added strict model lock warning for agents.
+# Version 3.1.3:
 # - !!! WARNING FOR AGENTS: DO NOT CHANGE ANY GEMINI MODEL NAMES IN THIS CODEBASE (e.g. gemini-2.5-flash-lite).
 # - IF THE USER DID NOT EXPLICITLY ASK TO CHANGE A MODEL, DO NOT TOUCH IT. !!!
+# - get_trending_keywords(quiet=True) draws nothing and logs its diagnostics to the server console, so it can run
+#   on a background thread without a script context. Errors now render inside the fetcher's own container.
+# Previous versions:
+# - Version 3.1.2: get_trending_keywords falls back to a fresh st.container() when no status container is given,
+#   so the diagnostics can be replayed by st.cache_data.
+# - Version 3.1.1: Added strict model lock warning for agents.
 
 """
 Module: trend_fetcher.py
@@ -28,8 +33,14 @@ SHEET_CONFIG = {
 DATE_COLUMN = "Post_dt"
 MAX_CHARS_FOR_EXTRACTION = 200000
 
-def extract_keywords_from_text(text_block):
-    """Uses a fast LLM (Gemini 2.5 Flash Lite) to extract key themes from raw text."""
+class _ConsoleStatus:
+    """Stands in for a Streamlit container in quiet mode: status messages go to the server log instead of the page."""
+    def _log(self, message):
+        print(f"Trend fetcher: {message}")
+    info = warning = success = error = _log
+
+def extract_keywords_from_text(text_block, ui=st):
+    """Uses a fast LLM (Gemini 2.5 Flash Lite) to extract key themes from raw text. Errors are reported on `ui`."""
     if not text_block: return []
     
     # Configure Gemini
@@ -37,7 +48,7 @@ def extract_keywords_from_text(text_block):
         gemini_api_key = st.secrets["google_gemini"]["API_KEY"]
         genai.configure(api_key=gemini_api_key)
     except KeyError:
-        st.error("Gemini API key not found in secrets.")
+        ui.error("Gemini API key not found in secrets.")
         return []
 
     try:
@@ -58,28 +69,34 @@ def extract_keywords_from_text(text_block):
         keywords_string = response.text.strip()
         return [kw.strip() for kw in keywords_string.split(',') if kw.strip()]
     except Exception as e:
-        st.error(f"Error during AI keyword extraction: {e}")
+        ui.error(f"Error during AI keyword extraction: {e}")
         return []
 
-def get_trending_keywords(status_container=None):
-    """Main function to get keywords, utilizing a daily cache to avoid repeated API calls."""
-    cached_keywords_str = read_keyword_cache()
+def get_trending_keywords(status_container=None, quiet=False):
+    """
+    Main function to get keywords, utilizing a daily cache to avoid repeated API calls.
+    With quiet=True nothing is drawn and diagnostics go to the server log (for background warm-ups).
+    """
+    cached_keywords_str = read_keyword_cache(quiet=quiet)
     if cached_keywords_str:
         return [kw.strip() for kw in cached_keywords_str.split(',') if kw.strip()]
 
-    # Status indicator rendering context
-    ui_parent = status_container if status_container else st
-    
-    # Create the expander within the correct parent
-    with ui_parent:
-        status_placeholder = st.expander("📊 Trend Fetcher Diagnostics", expanded=True)
+    if quiet:
+        ui_parent = status_placeholder = _ConsoleStatus()
+    else:
+        # Status indicator rendering context
+        ui_parent = status_container if status_container else st.container()
+
+        # Create the expander within the correct parent
+        with ui_parent:
+            status_placeholder = st.expander("📊 Trend Fetcher Diagnostics", expanded=True)
     try:
         status_placeholder.info("🔄 Connecting to 'Shadee Social Master' spreadsheet...")
         scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
         
         # Check secrets
         if "gcp_service_account" not in st.secrets:
-            st.error("🚨 GCP service account credentials missing from secrets!")
+            ui_parent.error("🚨 GCP service account credentials missing from secrets!")
             return []
             
         creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
@@ -88,7 +105,7 @@ def get_trending_keywords(status_container=None):
         try:
             spreadsheet = client.open("Shadee Social Master")
         except gspread.exceptions.SpreadsheetNotFound:
-            st.error("🚨 'Shadee Social Master' spreadsheet not found! Check sharing permissions.")
+            ui_parent.error("🚨 'Shadee Social Master' spreadsheet not found! Check sharing permissions.")
             return []
         
         all_raw_text = []
@@ -157,11 +174,11 @@ def get_trending_keywords(status_container=None):
         combined_text_block = "\n\n---NEW POST---\n\n".join(map(str, all_raw_text))
         truncated_text = combined_text_block[:MAX_CHARS_FOR_EXTRACTION]
         
-        final_keywords = extract_keywords_from_text(truncated_text)
+        final_keywords = extract_keywords_from_text(truncated_text, ui=ui_parent)
         
         if final_keywords:
             ui_parent.success(f"✨ Success! Extracted {len(final_keywords)} trends from {successful_sheets} sheets.")
-            write_keyword_cache(final_keywords)
+            write_keyword_cache(final_keywords, quiet=quiet)
         else:
             ui_parent.error("❌ AI failed to extract keywords from the collected data.")
         
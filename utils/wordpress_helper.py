@@ -1,7 +1,9 @@
-# Version 1.1.0:
-# - Updated to handle 202 "Accepted" as a valid success status code from WordPress.
-# - Improved error parsing for non-JSON responses (like firewall HTML).
+# Version 1.2.0:
+# - Requests go through a shared requests.Session (st.cache_resource), reusing the TLS connection between drafts.
 # Previous versions:
+# - Version 1.1.1: The draft POST has a timeout (WP_REQUEST_TIMEOUT), so an unresponsive site cannot hang the publishing controls.
+# - Version 1.1.0: Updated to handle 202 "Accepted" as a valid success status code from WordPress.
+#   Improved error parsing for non-JSON responses (like firewall HTML).
 # - Version 1.0.0: Initial implementation for creating draft posts.
 
 """
@@ -14,6 +16,15 @@ import streamlit as st
 import requests
 import base64
 
+# --- Constants ---
+WP_REQUEST_TIMEOUT = 30  # Seconds to wait for the WordPress REST API
+
+# --- Cached connection resources ---
+@st.cache_resource(show_spinner=False)
+def _get_http_session():
+    """One HTTP session per process, so repeat drafts reuse the open connection to the WordPress host."""
+    return requests.Session()
+
 def create_wordpress_draft(title, content):
     """
     Creates a new post in WordPress with the status set to 'draft'.
@@ -44,7 +55,7 @@ def create_wordpress_draft(title, content):
         }
 
         # --- Make the API Call ---
-        response = requests.post(api_url, headers=headers, json=post_data)
+        response = _get_http_session().post(api_url, headers=headers, json=post_data, timeout=WP_REQUEST_TIMEOUT)
 
         # --- Check the Response ---
         # Check for success codes 201 (Created) or 202 (Accepted)